@@ -1,4 +1,4 @@
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Mapping, MutableMapping
 from os import PathLike
 from pathlib import Path
 from typing import Any, cast
@@ -23,7 +23,8 @@ class TemplateRenderingError(Exception):
 
 class TemplateOutputError(Exception):
     """
-    Raised when a rendered template could not be written to disk.
+    Raised when a rendered template could not be output (written to disk or
+    stored in the output mapping).
     """
 
 
@@ -80,10 +81,11 @@ class DirTemplate:
                 keep_trailing_newline=True,
             ),
         )
+        self.environment.mondir = self._make_mondir_data()
 
     def render(
         self,
-        output_dir: Path | PathLike | str,
+        output_dir: Path | PathLike | str | MutableMapping[str, str],
         /,
         *args: Mapping[str, Any],
         **kwargs: Any,
@@ -93,7 +95,10 @@ class DirTemplate:
 
         Args:
             output_dir: Path of the directory into which to place the output
-                files.
+                files. Alternatively, a mutable mapping (e.g. a ``dict``) into
+                which to store the rendered contents of each output file
+                instead, keyed by its (POSIX-style) path relative to the
+                output directory, which avoids any disk I/O.
             *args: If used, must contain a single mapping of template
                 parameters (like Jinja's own :meth:`Template.render()
                 <jinja2.Template.render>`).
@@ -105,12 +110,19 @@ class DirTemplate:
             TemplateLoadingError: If the template could not be loaded.
             TemplateRenderingError: If the template could not be rendered.
             TemplateOutputError: If the rendered template could not be output
-                (written to disk).
+                (written to disk or stored in the output mapping).
         """
         # normalize args
-        output_dir_path = (
-            output_dir if isinstance(output_dir, Path) else Path(output_dir)
-        )
+        output_map: MutableMapping[str, str] | None = None
+        output_dir_path: Path | None = None
+        if isinstance(output_dir, MutableMapping):
+            output_map = output_dir
+        else:
+            output_dir_path = (
+                output_dir
+                if isinstance(output_dir, Path)
+                else Path(output_dir)
+            )
         template_params: Mapping[str, Any]
         if len(args) > 0:
             if len(args) != 1:
@@ -131,37 +143,76 @@ class DirTemplate:
         # /normalize args
         for template_name in self.loader.list_templates():
             try:
-                template = self.environment.get_template(template_name)
-            except Exception as e:
-                # just b/c Jinja doesn't have dbg logs or nice exceptions...
-                raise TemplateLoadingError(
-                    f"error loading template {template_name!r}"
-                ) from e
-            try:
-                template.render(**template_params)
-            except Exception as e:
-                raise TemplateRenderingError(
-                    f"error rendering template {template_name!r} with params "
-                    f"{template_params!r}"
-                ) from e
+                rendered_files_map = self._render_template(
+                    template_name, template_params
+                )
+            finally:
+                # we have to wipe this manually because AFAIK Jinja provides
+                # nothing in the way of per-render state => easiest to do it
+                # ourselves; this is also what makes this not thread-safe...
+                # doing it even on errors means state from a failed render
+                # can't leak into the next one
+                self.environment.mondir = self._make_mondir_data()
             try:
-                for (
-                    filename,
-                    content,
-                ) in self.environment.mondir.rendered_files_map.items():
-                    output_path = output_dir_path / Path(filename).relative_to(
+                for filename, content in rendered_files_map.items():
+                    relative_path = Path(filename).relative_to(
                         self.templates_dir_path
                     )
-                    mkdir_parents_up_to(
-                        output_path, output_dir_path, exist_ok=self.overwrite
-                    )
-                    with output_path.open("w" if self.overwrite else "x") as o:
-                        o.write(content)
+                    if output_map is not None:
+                        self._store_output(output_map, relative_path, content)
+                    else:
+                        assert output_dir_path is not None
+                        self._write_output(
+                            output_dir_path, relative_path, content
+                        )
             except Exception as e:
                 raise TemplateOutputError(
                     f"error writing output of template {template_name!r}"
                 ) from e
-            # we have to wipe this manually because AFAIK Jinja provides
-            # nothing in the way of per-render state => easiest to do it
-            # ourselves; this is also what makes this not thread-safe...
-            self.environment.mondir = MondirData()
+
+    @staticmethod
+    def _make_mondir_data() -> MondirData:
+        # we only care about the rendered files, not the output of Jinja's
+        # render(), so there's no point in producing a log of operations
+        return MondirData(log_operations=False)
+
+    def _render_template(
+        self, template_name: str, template_params: Mapping[str, Any]
+    ) -> dict[str, str]:
+        try:
+            template = self.environment.get_template(template_name)
+        except Exception as e:
+            # just b/c Jinja doesn't have dbg logs or nice exceptions...
+            raise TemplateLoadingError(
+                f"error loading template {template_name!r}"
+            ) from e
+        try:
+            template.render(**template_params)
+        except Exception as e:
+            raise TemplateRenderingError(
+                f"error rendering template {template_name!r} with params "
+                f"{template_params!r}"
+            ) from e
+        return self.environment.mondir.rendered_files_map
+
+    def _write_output(
+        self, output_dir_path: Path, relative_path: Path, content: str
+    ) -> None:
+        output_path = output_dir_path / relative_path
+        mkdir_parents_up_to(
+            output_path, output_dir_path, exist_ok=self.overwrite
+        )
+        with output_path.open("w" if self.overwrite else "x") as o:
+            o.write(content)
+
+    def _store_output(
+        self,
+        output_map: MutableMapping[str, str],
+        relative_path: Path,
+        content: str,
+    ) -> None:
+        key = relative_path.as_posix()
+        if not self.overwrite and key in output_map:
+            # same exception as when writing to disk for consistency
+            raise FileExistsError(f"output mapping already contains {key!r}")
+        output_map[key] = content
@@ -1,4 +1,3 @@
-from collections import deque
 from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -14,14 +13,27 @@ from jinja2.parser import Parser
 from ..utils.pseudo_list import PseudoList
 from .utils import SingleTagExtension
 
-
-@dataclass
+# bits of MondirData.context_mask, each recording whether we're currently
+# parsing the contents of the corresponding tag
+THISFILE_CONTEXT = 1
+FILENAME_CONTEXT = 2
+DIRLEVEL_CONTEXT = 4
+CONTENT_CONTEXT = 8
+CONTEXT_BITS = {
+    "thisfile": THISFILE_CONTEXT,
+    "filename": FILENAME_CONTEXT,
+    "dirlevel": DIRLEVEL_CONTEXT,
+    "content": CONTENT_CONTEXT,
+}
+
+
+@dataclass(slots=True)
 class RenderedFile:
     filename: str
     contents: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RenderingFile:
     """
     File for which rendering information is still being collected.
@@ -59,7 +71,7 @@ class RenderingFile:
         return RenderedFile(filename, contents)
 
 
-@dataclass
+@dataclass(slots=True)
 class MondirData:
     # parsing
     file_contents_receptacles: list[list[Node]] = field(default_factory=list)
@@ -72,14 +84,22 @@ class MondirData:
     # outside (with reduced functionality) as a shortcut
     standalone_filename: list[Node] = field(default_factory=list)
     standalone_thisfile: list[Node] = field(default_factory=list)
-    # info on parsing context (only required because Jinja's _tag_stack is
-    # private...)
-    tag_stack: deque[str] = field(default_factory=deque)
+    # which of our tags we're currently inside of while parsing, as a bitmask
+    # of the *_CONTEXT constants above
+    context_mask: int = 0
     # collecting rendered parts
     rendering_file: RenderingFile | None = None
     # final output
     rendered_files: list[RenderedFile] = field(default_factory=list)
     "Final rendered files"
+    # options
+    log_operations: bool = True
+    """
+    Whether to output a log of operations as the result of Jinja's `render()`.
+
+    Mondir itself never looks at that output, so it disables this to skip
+    building the log (which includes copies of all rendered file contents).
+    """
 
     @property
     def rendered_files_map(self) -> dict[str, str]:
@@ -120,17 +140,20 @@ class MondirStateExtension(Extension):
         return self.environment.mondir
 
 
-class MondirStateWithTagStackExtension(
+class MondirStateWithContextExtension(
     SingleTagExtension, MondirStateExtension
 ):
     def parse(self, parser: Parser) -> Node | list[Node]:
-        self.state.tag_stack.append(self.tag)
+        # restoring the previous mask (instead of clearing our bit) keeps it
+        # correct for nested tags of the same kind
+        previous_context_mask = self.state.context_mask
+        self.state.context_mask |= CONTEXT_BITS[self.tag]
         try:
             # first token is necessarily own tag name, get lineno & skip:
             lineno = parser.stream.expect(f"name:{self.tag}").lineno
             return self.parse_own_tag(parser, lineno)
         finally:
-            self.state.tag_stack.pop()
+            self.state.context_mask = previous_context_mask
 
     # should be abstract but metaclass already set by SingleTagExtension...
     def parse_own_tag(self, parser: Parser, lineno: int) -> Node | list[Node]:
@@ -139,7 +162,7 @@ class MondirStateWithTagStackExtension(
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class FileCallbackNodes(PseudoList):
     start: CallBlock
     'The "start file" callback node.'
@@ -254,7 +277,7 @@ class ExtensionWithFileCallbacks(MondirStateExtension):
             self.state.rendering_file is None
         ), "bug: started rendering new file before previous was done"
         self.state.rendering_file = RenderingFile()
-        return "start new file\n"
+        return "start new file\n" if self.state.log_operations else ""
 
     def done_rendering_file(self, caller: Callable[..., str]) -> str:
         assert (
@@ -262,7 +285,7 @@ class ExtensionWithFileCallbacks(MondirStateExtension):
         ), "bug: file rendering done callback called but no file in progress"
         self.state.rendered_files.append(self.state.rendering_file.done())
         self.state.rendering_file = None
-        return "done with file\n"
+        return "done with file\n" if self.state.log_operations else ""
 
     def set_filename(self, caller: Callable[..., str]) -> str:
         assert (
@@ -272,6 +295,8 @@ class ExtensionWithFileCallbacks(MondirStateExtension):
         if not filename:
             raise ValueError("empty filename encountered")
         self.state.rendering_file.filename = filename
+        if not self.state.log_operations:
+            return ""
         return f"  set filename to {filename!r}\n"
 
     def set_fallback_filename(self, caller: Callable[..., str]) -> str:
@@ -282,6 +307,8 @@ class ExtensionWithFileCallbacks(MondirStateExtension):
         if not filename:
             raise ValueError("empty filename encountered")
         self.state.rendering_file.fallback_filename = filename
+        if not self.state.log_operations:
+            return ""
         return f"  set fallback filename to {filename!r}\n"
 
     def set_file_contents(self, caller: Callable[..., str]) -> str:
@@ -290,6 +317,8 @@ class ExtensionWithFileCallbacks(MondirStateExtension):
         ), "bug: file contents callback called but no file in progress"
         output = caller()
         self.state.rendering_file.contents = output
+        if not self.state.log_operations:
+            return ""
         return "  set output to:\n" + indent(output, "    ") + "\n"
 
     def set_fallback_file_contents(self, caller: Callable[..., str]) -> str:
@@ -299,11 +328,13 @@ class ExtensionWithFileCallbacks(MondirStateExtension):
         )
         output = caller()
         self.state.rendering_file.fallback_contents = output
+        if not self.state.log_operations:
+            return ""
         return "  set fallback output to:\n" + indent(output, "    ") + "\n"
 
 
 class ThisfileExtension(
-    ExtensionWithFileCallbacks, MondirStateWithTagStackExtension
+    ExtensionWithFileCallbacks, MondirStateWithContextExtension
 ):
     tag = "thisfile"
 
@@ -315,7 +346,7 @@ class ThisfileExtension(
                 "for now, these are mutually exclusive",
                 lineno,
             )
-        if "filename" in self.state.tag_stack:
+        if self.state.context_mask & FILENAME_CONTEXT:
             raise TemplateSyntaxError(
                 "thisfile tags encountered inside filename tags; "
                 "that doesn't make any sense, so the template is invalid",
@@ -341,7 +372,7 @@ class ThisfileExtension(
 
         # we need to make sure the dir-level subtree is stored outside the
         # template AST so that the latter contains the contents only
-        if "dirlevel" in self.state.tag_stack:
+        if self.state.context_mask & DIRLEVEL_CONTEXT:
             # if we're already inside dirlevel tags, we have them handle this
             return dir_level_body_parts
         else:
@@ -439,7 +470,7 @@ class ActualFilenameExtension(ExtensionWithFileCallbacks, SingleTagExtension):
 
 
 class FilenameExtension(
-    ExtensionWithFileCallbacks, MondirStateWithTagStackExtension
+    ExtensionWithFileCallbacks, MondirStateWithContextExtension
 ):
     """
     Allows setting the desired output filename template.
@@ -455,9 +486,9 @@ class FilenameExtension(
         call_block = self.make_filename_call_block(body)
 
         # what exactly we do with that depends on usage context:
-        if "thisfile" in self.state.tag_stack:
+        if self.state.context_mask & THISFILE_CONTEXT:
             return call_block
-        elif "dirlevel" in self.state.tag_stack:
+        elif self.state.context_mask & DIRLEVEL_CONTEXT:
             raise TemplateSyntaxError(
                 "filename tags can't be used outside thisfile in dirlevel "
                 "tags",
@@ -481,7 +512,7 @@ class FilenameExtension(
 
 
 class ContentExtension(
-    ExtensionWithFileCallbacks, MondirStateWithTagStackExtension
+    ExtensionWithFileCallbacks, MondirStateWithContextExtension
 ):
     """
     Allows overriding the desired output content template.
@@ -493,7 +524,7 @@ class ContentExtension(
 
     def parse_own_tag(self, parser: Parser, lineno: int) -> Node | list[Node]:
         # check if usage context is ok
-        if "thisfile" not in parser._tag_stack:
+        if not self.state.context_mask & THISFILE_CONTEXT:
             raise TemplateSyntaxError(
                 "content tags can only be used inside thisfile tags",
                 lineno,
@@ -506,7 +537,7 @@ class ContentExtension(
         return self.make_file_contents_call_block(body)
 
 
-class DirLevelExtension(MondirStateWithTagStackExtension):
+class DirLevelExtension(MondirStateWithContextExtension):
     tag = "dirlevel"
 
     def parse_own_tag(self, parser: Parser, lineno: int) -> Node | list[Node]:
@@ -523,13 +554,13 @@ class DirLevelExtension(MondirStateWithTagStackExtension):
                 "for now, these are mutually exclusive",
                 lineno,
             )
-        if "filename" in self.state.tag_stack:
+        if self.state.context_mask & FILENAME_CONTEXT:
             raise TemplateSyntaxError(
                 "dirlevel tags encountered inside filename tags; "
                 "that doesn't make any sense, so the template is invalid",
                 lineno,
             )
-        if "thisfile" in self.state.tag_stack:
+        if self.state.context_mask & THISFILE_CONTEXT:
             raise TemplateSyntaxError(
                 "dirlevel tags encountered inside thisfile tags; "
                 "that doesn't make any sense, so the template is invalid",
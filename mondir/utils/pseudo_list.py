@@ -9,6 +9,9 @@ class PseudoList(list):
     called, ensuring obvious errors instead of hard to find bugs.
     """
 
+    # no instance __dict__, so subclasses can be fully slotted
+    __slots__ = ()
+
     EXC_MESSAGE: str = "see PseudoList docstring"
 
     def not_impl(self):
@@ -0,0 +1,56 @@
+from importlib import resources
+
+import pytest
+
+from .utils.tree_compare import tree_manifest
+
+# resolved once at import rather than on every fixture setup
+_EXAMPLE1 = resources.files("mondir_resources_anchor") / "examples/greetings"
+_EXAMPLE1_EXPECTED_OUTPUTS = (
+    resources.files() / "data/expected-outputs/greetings"
+)
+_EXAMPLE_NESTED = (
+    resources.files("mondir_resources_anchor") / "examples/nested"
+)
+_EXAMPLE_NESTED_EXPECTED_OUTPUTS = (
+    resources.files() / "data/expected-outputs/nested"
+)
+
+
+@pytest.fixture(scope="session")
+def example1_dir():
+    with resources.as_file(_EXAMPLE1) as p:
+        yield p
+
+
+@pytest.fixture(scope="session")
+def example1_expected_outputs_dir():
+    with resources.as_file(_EXAMPLE1_EXPECTED_OUTPUTS) as p:
+        yield p
+
+
+@pytest.fixture(scope="session")
+def example_nested_dir():
+    with resources.as_file(_EXAMPLE_NESTED) as p:
+        yield p
+
+
+@pytest.fixture(scope="session")
+def example_nested_expected_outputs_dir():
+    with resources.as_file(_EXAMPLE_NESTED_EXPECTED_OUTPUTS) as p:
+        yield p
+
+
+# the expected outputs never change, so they only need to be hashed once
+
+
+@pytest.fixture(scope="session")
+def example1_expected_outputs_manifest(example1_expected_outputs_dir):
+    return tree_manifest(example1_expected_outputs_dir)
+
+
+@pytest.fixture(scope="session")
+def example_nested_expected_outputs_manifest(
+    example_nested_expected_outputs_dir,
+):
+    return tree_manifest(example_nested_expected_outputs_dir)
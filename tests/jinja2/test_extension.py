@@ -1,4 +1,6 @@
-from textwrap import dedent
+import re
+from functools import cache
+from types import MappingProxyType
 
 import pytest
 from jinja2 import Environment, TemplateSyntaxError
@@ -24,18 +26,109 @@ from mondir.jinja2.extension import (
 )
 from mondir.jinja2.loaders import FilenameDictLoader
 
-from ..utils.parametrization import autodetect_parameters, case
 
+@cache
+def _shared_environment(extensions):
+    return Environment(loader=FilenameDictLoader({}), extensions=extensions)
 
-def filename_dict_loader_environment(mapping, extensions=extensions):
+
+def filename_dict_loader_environment(
+    mapping, extensions=extensions, log_operations=True
+):
     """
-    Create a mondir environment using the `FilenameDictLoader` template loader.
+    Get a mondir environment using the `FilenameDictLoader` template loader.
 
     Defaults to using all mondir extensions loaded but this can be overridden
-    via the `extensions` parameter.
+    via the `extensions` parameter. Tests that don't check the log of
+    operations output by `render()` can skip building it by passing
+    `log_operations=False`.
+
+    Environments are shared between all callers using the same extensions, as
+    constructing them is comparatively expensive; their loader mapping and
+    mondir state are reset on each call instead. The template cache is kept,
+    so identical template names and sources are only parsed once (changed
+    sources are detected by the loader's up-to-date check), which means tests
+    inspecting parse-time state must clear it themselves.
+    """
+    environment = _shared_environment(tuple(extensions))
+    environment.loader.mapping = mapping
+    environment.mondir = MondirData(log_operations=log_operations)
+    return environment
+
+
+def thisfile_callback_block(method_name, body=None):
+    """
+    Make the call block node that calls a `ThisfileExtension` callback method.
     """
-    loader = FilenameDictLoader(mapping)
-    return Environment(loader=loader, extensions=extensions)
+    return CallBlock(
+        Call(
+            ExtensionAttribute(
+                "mondir.jinja2.extension.ThisfileExtension", method_name
+            ),
+            [],
+            [],
+            None,
+            None,
+        ),
+        [],
+        [],
+        [] if body is None else body,
+    )
+
+
+# rendering is not tested in test_parsing_and_storing_ast so it doesn't need
+# all extensions
+EXTS_PARSING_ONLY = (
+    ActualFilenameExtension,
+    ThisfileExtension,
+    DirLevelExtension,
+)
+
+# expected parsing result for test_parsing_and_storing_ast, built only once
+EXPECTED_AST = MondirData(
+    file_contents_receptacles=[[]],
+    dir_level_body=None,
+    standalone_thisfile=[
+        For(
+            Name("_fysite_vars", "store"),
+            Filter(
+                Name("files", "load"),
+                "reverse",
+                [],
+                [],
+                None,
+                None,
+            ),
+            [
+                OverlayScope(
+                    Name("_fysite_vars", "store"),
+                    FileCallbackNodes(
+                        thisfile_callback_block("start_rendering_file"),
+                        [],
+                        [
+                            thisfile_callback_block(
+                                "set_fallback_filename",
+                                [Output([TemplateData("myfile")])],
+                            ),
+                        ],
+                        [
+                            thisfile_callback_block(
+                                "set_fallback_file_contents"
+                            ),
+                        ],
+                        thisfile_callback_block("done_rendering_file"),
+                    ),
+                )
+            ],
+            None,
+            None,
+            False,
+        )
+    ],
+    actual_filename=[Output([TemplateData("myfile")])],
+    rendering_file=None,
+    rendered_files=[],
+)
 
 
 def test_parsing_and_storing_ast():
@@ -48,168 +141,61 @@ def test_parsing_and_storing_ast():
             "myfile": "{% for x in i %}{% endfor %}"
             "{% thisfile for * in files|reverse %}foo"
         },
-        # rendering is not tested here so we don't need all extensions
-        extensions=[
-            ActualFilenameExtension,
-            ThisfileExtension,
-            DirLevelExtension,
-        ],
+        extensions=EXTS_PARSING_ONLY,
     )
+    # parse-time state is only populated if the template is actually parsed
+    environment.cache.clear()
     # run
     t = environment.get_template("myfile")
     rendered = t.render()
     # check
-    assert t.environment.mondir == MondirData(
-        file_contents_receptacles=[[]],
-        dir_level_body=None,
-        standalone_thisfile=[
-            For(
-                Name("_fysite_vars", "store"),
-                Filter(
-                    Name("files", "load"),
-                    "reverse",
-                    [],
-                    [],
-                    None,
-                    None,
-                ),
-                [
-                    OverlayScope(
-                        Name("_fysite_vars", "store"),
-                        FileCallbackNodes(
-                            CallBlock(
-                                Call(
-                                    ExtensionAttribute(
-                                        "mondir.jinja2.extension."
-                                        "ThisfileExtension",
-                                        "start_rendering_file",
-                                    ),
-                                    [],
-                                    [],
-                                    None,
-                                    None,
-                                ),
-                                [],
-                                [],
-                                [],
-                            ),
-                            [],
-                            [
-                                CallBlock(
-                                    Call(
-                                        ExtensionAttribute(
-                                            "mondir.jinja2.extension."
-                                            "ThisfileExtension",
-                                            "set_fallback_filename",
-                                        ),
-                                        [],
-                                        [],
-                                        None,
-                                        None,
-                                    ),
-                                    [],
-                                    [],
-                                    [Output([TemplateData("myfile")])],
-                                ),
-                            ],
-                            [
-                                CallBlock(
-                                    Call(
-                                        ExtensionAttribute(
-                                            "mondir.jinja2.extension."
-                                            "ThisfileExtension",
-                                            "set_fallback_file_contents",
-                                        ),
-                                        [],
-                                        [],
-                                        None,
-                                        None,
-                                    ),
-                                    [],
-                                    [],
-                                    [],
-                                ),
-                            ],
-                            CallBlock(
-                                Call(
-                                    ExtensionAttribute(
-                                        "mondir.jinja2.extension."
-                                        "ThisfileExtension",
-                                        "done_rendering_file",
-                                    ),
-                                    [],
-                                    [],
-                                    None,
-                                    None,
-                                ),
-                                [],
-                                [],
-                                [],
-                            ),
-                        ),
-                    )
-                ],
-                None,
-                None,
-                False,
-            )
-        ],
-        actual_filename=[Output([TemplateData("myfile")])],
-        rendering_file=None,
-        rendered_files=[],
-    )
+    assert t.environment.mondir == EXPECTED_AST
     assert rendered == "foo"
 
 
-@autodetect_parameters()
-@case(
-    name="inline_loop_explicit_variable",
-    template_filename="{{ x }}.txt",
-    source='{% thisfile for x in ["b", "a"]|reverse %}x: {{x}}',
-)
-@case(
-    name="inline_loop_star",
-    template_filename="{{ x }}.txt",
-    source='{% thisfile for * in [{"x": "a"}, {"x": "b"}] %}x: {{x}}',
-)
-@case(
-    name="inline_loop_star_filename_in_with",
-    template_filename="template.txt",
-    source='{% thisfile for * in [{"x": "a"}, {"x": "b"}] with %}'
-    "{% filename %}{{x}}.txt{% endfilename %}{% endthisfile %}x: {{x}}",
-)
-@case(
-    name="jinja_loop_in_dirlevel",
-    template_filename="{{ x }}.txt",
-    source=(
+# different ways of rendering the same files (see test_render_different_ways)
+RENDER_CASES = [
+    pytest.param(
+        "{{ x }}.txt",
+        '{% thisfile for x in ["b", "a"]|reverse %}x: {{x}}',
+        id="inline_loop_explicit_variable",
+    ),
+    pytest.param(
+        "{{ x }}.txt",
+        '{% thisfile for * in [{"x": "a"}, {"x": "b"}] %}x: {{x}}',
+        id="inline_loop_star",
+    ),
+    pytest.param(
+        "template.txt",
+        '{% thisfile for * in [{"x": "a"}, {"x": "b"}] with %}'
+        "{% filename %}{{x}}.txt{% endfilename %}{% endthisfile %}"
+        "x: {{x}}",
+        id="inline_loop_star_filename_in_with",
+    ),
+    pytest.param(
+        "{{ x }}.txt",
         '{% dirlevel %}{% for x in ["a", "b"] %}'
-        "{% thisfile %}{% endfor %}{% enddirlevel %}x: {{x}}"
+        "{% thisfile %}{% endfor %}{% enddirlevel %}x: {{x}}",
+        id="jinja_loop_in_dirlevel",
     ),
-)
-@case(
-    name="jinja_loop_in_dirlevel_filename_in_with",
-    template_filename="template.txt",
-    source=(
+    pytest.param(
+        "template.txt",
         '{% dirlevel %}{% for x in ["a", "b"] %}'
         "{% thisfile with %}{% filename %}{{x}}.txt{% endfilename %}"
-        "{% endthisfile %}{% endfor %}{% enddirlevel %}x: {{x}}"
+        "{% endthisfile %}{% endfor %}{% enddirlevel %}x: {{x}}",
+        id="jinja_loop_in_dirlevel_filename_in_with",
     ),
-)
-@case(
-    name="multiple_thisfile_in_dirlevel",
-    template_filename="{{ x }}.txt",
-    source=(
+    pytest.param(
+        "{{ x }}.txt",
         "{% dirlevel %}"
         '{% set x = "a" %}{% thisfile %}'
         '{% set x = "b" %}{% thisfile %}'
         "{% enddirlevel %}"
-        "x: {{x}}"
+        "x: {{x}}",
+        id="multiple_thisfile_in_dirlevel",
     ),
-)
-@case(
-    name="multiple_thisfile_in_dirlevel_filename_in_with",
-    template_filename="template.txt",
-    source=(
+    pytest.param(
+        "template.txt",
         "{% dirlevel %}"
         '{% set x = "a" %}{% thisfile with %}'
         "{% filename %}{{x}}.txt{% endfilename %}"
@@ -218,79 +204,100 @@ def test_parsing_and_storing_ast():
         "{% filename %}{{x}}.txt{% endfilename %}"
         "{% endthisfile %}"
         "{% enddirlevel %}"
-        "x: {{x}}"
+        "x: {{x}}",
+        id="multiple_thisfile_in_dirlevel_filename_in_with",
     ),
-)
-@case(
-    name="multiple_dirlevel_with_thisfile_static_filename_in_with",
-    template_filename="template.txt",
-    source=(
+    pytest.param(
+        "template.txt",
         '{% dirlevel %}{% set x = "a" %}{% thisfile with %}'
         "{% filename %}a.txt{% endfilename %}"
         "{% endthisfile %}{% enddirlevel %}"
         '{% dirlevel %}{% set x = "b" %}{% thisfile with %}'
         "{% filename %}b.txt{% endfilename %}"
         "{% endthisfile %}{% enddirlevel %}"
-        "x: {{x}}"
+        "x: {{x}}",
+        id="multiple_dirlevel_with_thisfile_static_filename_in_with",
     ),
-)
-@case(
-    name="multiple_standalone_thisfile_static_filename_and_vars_in_with",
-    template_filename="template.txt",
-    source=(
+    pytest.param(
+        "template.txt",
         '{% thisfile with %}{% set x = "a" %}'
         "{% filename %}a.txt{% endfilename %}"
         "{% endthisfile %}"
         '{% thisfile with %}{% set x = "b" %}'
         "{% filename %}b.txt{% endfilename %}"
         "{% endthisfile %}"
-        "x: {{x}}"
+        "x: {{x}}",
+        id="multiple_standalone_thisfile_static_filename_and_vars_in_with",
     ),
-)
-@case(
-    name="multiple_standalone_thisfile_template_filename_via_vars_in_with",
-    template_filename="{{ x }}.txt",
-    source=(
+    pytest.param(
+        "{{ x }}.txt",
         '{% thisfile with %}{% set x = "a" %}{% endthisfile %}'
         '{% thisfile with %}{% set x = "b" %}{% endthisfile %}'
-        "x: {{x}}"
+        "x: {{x}}",
+        id="multiple_standalone_thisfile_template_filename_via_vars_in_with",
     ),
-)
-@case(
-    name="multiple_standalone_thisfile_content_and_filename_in_with",
-    template_filename="{{ x }}.txt",
-    source=(
+    pytest.param(
+        "{{ x }}.txt",
         "{% thisfile with %}{% content %}x: a{% endcontent %}"
         "{% filename %}a.txt{% endfilename %}{% endthisfile %}"
         "{% thisfile with %}{% content %}x: b{% endcontent %}"
         "{% filename %}b.txt{% endfilename %}{% endthisfile %}"
-        "x: {{x}}"
+        "x: {{x}}",
+        id="multiple_standalone_thisfile_content_and_filename_in_with",
     ),
-)
-@case(
-    name="multiple_standalone_thisfile_mixed_fully_static_and_via_var_in_with",
-    template_filename="{{ x }}.txt",
-    source=(
+    pytest.param(
+        "{{ x }}.txt",
         "{% thisfile with %}{% content %}x: a{% endcontent %}"
         "{% filename %}a.txt{% endfilename %}{% endthisfile %}"
         '{% thisfile with %}{% set x = "b" %}{% endthisfile %}'
-        "x: {{x}}"
+        "x: {{x}}",
+        id=(
+            "multiple_standalone_thisfile_mixed_fully_static_and_via_var"
+            "_in_with"
+        ),
     ),
-)
+]
+
+
+# what each of the RENDER_CASES should render to (read-only)
+RENDER_CASES_OUTPUT = MappingProxyType({"a.txt": "x: a", "b.txt": "x: b"})
+
+
+@pytest.mark.parametrize("template_filename,source", RENDER_CASES)
 def test_render_different_ways(template_filename, source):
     """
     Test different ways of rendering the same text.
     """
     # prepare
-    environment = filename_dict_loader_environment({template_filename: source})
+    environment = filename_dict_loader_environment(
+        {template_filename: source}, log_operations=False
+    )
     # run
     t = environment.get_template(template_filename)
     t.render()
     # check
-    assert t.environment.mondir.rendered_files_map == {
-        "a.txt": "x: a",
-        "b.txt": "x: b",
-    }
+    assert t.environment.mondir.rendered_files_map == RENDER_CASES_OUTPUT
+
+
+# what rendering any template outputs before the actual log of operations
+LOG_PREAMBLE = """\
+if you see this text, you might be using this library wrong:
+as a single template can correspond to multiple output files,
+rendering templates as usual doesn't make a lot of sense.
+log of operations:
+"""
+
+# expected log of operations for test_render_static
+EXPECTED_STATIC_LOG = (
+    LOG_PREAMBLE
+    + """\
+start new file
+  set fallback filename to 'myfile'
+  set fallback output to:
+    x: a
+done with file
+"""
+)
 
 
 def test_render_static():
@@ -305,19 +312,37 @@ def test_render_static():
     rendered = t.render()
     # check
     assert t.environment.mondir.rendered_files_map == {"myfile": "x: a"}
-    assert rendered == dedent(
-        """\
-        if you see this text, you might be using this library wrong:
-        as a single template can correspond to multiple output files,
-        rendering templates as usual doesn't make a lot of sense.
-        log of operations:
-        start new file
-          set fallback filename to 'myfile'
-          set fallback output to:
-            x: a
-        done with file
-        """
+    assert rendered == EXPECTED_STATIC_LOG
+
+
+def test_render_without_log_of_operations():
+    """
+    Test that the log of operations can be disabled without affecting output.
+    """
+    # prepare
+    environment = filename_dict_loader_environment(
+        {"myfile": "x: a"}, log_operations=False
     )
+    # run
+    t = environment.get_template("myfile")
+    rendered = t.render()
+    # check
+    assert t.environment.mondir.rendered_files_map == {"myfile": "x: a"}
+    assert rendered == LOG_PREAMBLE
+
+
+# expected log of operations for test_render_filename_using_with
+EXPECTED_FILENAME_USING_WITH_LOG = (
+    LOG_PREAMBLE
+    + """\
+start new file
+  set filename to 'fn'
+  set fallback filename to 'myfile'
+  set fallback output to:
+    hello
+done with file
+"""
+)
 
 
 def test_render_filename_using_with():
@@ -334,20 +359,7 @@ def test_render_filename_using_with():
     rendered = t.render()
     # check
     assert t.environment.mondir.rendered_files_map == {"fn": "hello"}
-    assert rendered == dedent(
-        """\
-        if you see this text, you might be using this library wrong:
-        as a single template can correspond to multiple output files,
-        rendering templates as usual doesn't make a lot of sense.
-        log of operations:
-        start new file
-          set filename to 'fn'
-          set fallback filename to 'myfile'
-          set fallback output to:
-            hello
-        done with file
-        """
-    )
+    assert rendered == EXPECTED_FILENAME_USING_WITH_LOG
 
 
 def test_empty_dirlevel_means_no_output():
@@ -411,72 +423,77 @@ def test_actual_filename_keeps_preceding_path_intact():
     assert t.environment.mondir.rendered_files_map == {"mydir/myfile": "hello"}
 
 
-@autodetect_parameters()
-# Obvious nonsense: inverted nesting order
-@case(
-    name="dirlevel_not_possible_in_thisfile",
-    source="{% thisfile with %}{% dirlevel %}{% enddirlevel %}"
-    "{% endthisfile %}hello",
-    error="dirlevel tags encountered inside thisfile tags",
-)
-@case(
-    name="dirlevel_not_possible_in_filename",
-    source="{% filename %}{% dirlevel %}{% enddirlevel %}{% endfilename %}hi",
-    error="dirlevel tags encountered inside filename tags",
-)
-@case(
-    name="thisfile_not_possible_in_filename",
-    source="{% filename %}{% thisfile with %}{% endthisfile %}"
-    "{% endfilename %}hi",
-    error="thisfile tags encountered inside filename tags",
-)
-# Test that standalone filename and thisfile or dirlevel tags are mutually
-# exclusive.
-# This behavior might change in the future, but that should happen by a
-# conscious decision, not introduction of a bug - hence this test.
-@case(
-    name="standalone_filename_not_possible_after_thisfile",
-    source="{% thisfile %}{% filename %}fn{% endfilename %}hello",
-    error="standalone filename encountered after thisfile",
-)
-@case(
-    name="thisfile_not_possible_after_standalone_filename",
-    source="{% filename %}fn{% endfilename %}{% thisfile %}hello",
-    error="thisfile encountered after standalone filename",
-)
-@case(
-    name="standalone_filename_not_possible_after_dirlevel",
-    source="{% dirlevel %}{% enddirlevel %}{% filename %}fn{% endfilename %}",
-    error="standalone filename encountered after dirlevel",
-)
-@case(
-    name="dirlevel_not_possible_after_standalone_filename",
-    source="{% filename %}fn{% endfilename %}{% dirlevel %}{% enddirlevel %}",
-    error="dirlevel encountered after standalone filename",
-)
-# Other filename related tests
-@case(
-    name="standalone_filename_inside_dirlevel",
-    source=(
+# invalid templates and the errors they should raise
+SYNTAX_ERROR_CASES = [
+    # Obvious nonsense: inverted nesting order
+    pytest.param(
+        "{% thisfile with %}{% dirlevel %}{% enddirlevel %}"
+        "{% endthisfile %}hello",
+        re.compile("dirlevel tags encountered inside thisfile tags"),
+        id="dirlevel_not_possible_in_thisfile",
+    ),
+    pytest.param(
+        "{% filename %}{% dirlevel %}{% enddirlevel %}{% endfilename %}hi",
+        re.compile("dirlevel tags encountered inside filename tags"),
+        id="dirlevel_not_possible_in_filename",
+    ),
+    pytest.param(
+        "{% filename %}{% thisfile with %}{% endthisfile %}"
+        "{% endfilename %}hi",
+        re.compile("thisfile tags encountered inside filename tags"),
+        id="thisfile_not_possible_in_filename",
+    ),
+    # Test that standalone filename and thisfile or dirlevel tags are
+    # mutually exclusive.
+    # This behavior might change in the future, but that should happen by
+    # a conscious decision, not introduction of a bug - hence this test.
+    pytest.param(
+        "{% thisfile %}{% filename %}fn{% endfilename %}hello",
+        re.compile("standalone filename encountered after thisfile"),
+        id="standalone_filename_not_possible_after_thisfile",
+    ),
+    pytest.param(
+        "{% filename %}fn{% endfilename %}{% thisfile %}hello",
+        re.compile("thisfile encountered after standalone filename"),
+        id="thisfile_not_possible_after_standalone_filename",
+    ),
+    pytest.param(
+        "{% dirlevel %}{% enddirlevel %}{% filename %}fn{% endfilename %}",
+        re.compile("standalone filename encountered after dirlevel"),
+        id="standalone_filename_not_possible_after_dirlevel",
+    ),
+    pytest.param(
+        "{% filename %}fn{% endfilename %}{% dirlevel %}{% enddirlevel %}",
+        re.compile("dirlevel encountered after standalone filename"),
+        id="dirlevel_not_possible_after_standalone_filename",
+    ),
+    # Other filename related tests
+    pytest.param(
         "{% dirlevel %}{% thisfile %}{% filename %}fn{% endfilename %}"
-        "{% enddirlevel %}hello"
+        "{% enddirlevel %}hello",
+        re.compile(
+            "filename tags can't be used outside thisfile in dirlevel tags"
+        ),
+        id="standalone_filename_inside_dirlevel",
     ),
-    error="filename tags can't be used outside thisfile in dirlevel tags",
-)
-# Test that dirlevel and standalone thisfile tags preclude one another, no
-# matter which comes first.
-# This behavior could also change in the future if it turns out there is a
-# good "natural" choice for what to do in this case.
-@case(
-    name="standalone_thisfile_not_possible_after_dirlevel",
-    source="{% dirlevel %}{% thisfile %}{% enddirlevel %}{% thisfile %}",
-    error="standalone thisfile encountered after dirlevel tags",
-)
-@case(
-    name="dirlevel_not_possible_after_standalone_thisfile",
-    source="{% thisfile %}{% dirlevel %}{% thisfile %}{% enddirlevel %}",
-    error="dirlevel tags encountered after standalone thisfile",
-)
+    # Test that dirlevel and standalone thisfile tags preclude one another,
+    # no matter which comes first.
+    # This behavior could also change in the future if it turns out there
+    # is a good "natural" choice for what to do in this case.
+    pytest.param(
+        "{% dirlevel %}{% thisfile %}{% enddirlevel %}{% thisfile %}",
+        re.compile("standalone thisfile encountered after dirlevel tags"),
+        id="standalone_thisfile_not_possible_after_dirlevel",
+    ),
+    pytest.param(
+        "{% thisfile %}{% dirlevel %}{% thisfile %}{% enddirlevel %}",
+        re.compile("dirlevel tags encountered after standalone thisfile"),
+        id="dirlevel_not_possible_after_standalone_thisfile",
+    ),
+]
+
+
+@pytest.mark.parametrize("source,error", SYNTAX_ERROR_CASES)
 def test_template_syntax_errors(source, error):
     """
     Test that various kinds of invalid usage raise exceptions.
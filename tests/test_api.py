@@ -1,109 +1,123 @@
-from filecmp import dircmp
-from importlib import resources
-
 import pytest
 
 from mondir.api import DirTemplate, TemplateOutputError
 
-package_name = "mondir"
-
+from .utils.tree_compare import assert_tree_matches
 
-@pytest.fixture(scope="module")
-def example1_dir():
-    with resources.as_file(
-        resources.files("mondir_resources_anchor") / "examples/greetings"
-    ) as p:
-        yield p
+package_name = "mondir"
 
 
 @pytest.fixture(scope="module")
-def example1_expected_outputs_dir():
-    with resources.as_file(
-        resources.files() / "data/expected-outputs/greetings"
-    ) as p:
-        yield p
+def example1_template(example1_dir):
+    return DirTemplate(example1_dir)
 
 
 def test_basic_rendering(
-    example1_dir, example1_expected_outputs_dir, tmp_path
+    example1_template, example1_expected_outputs_manifest, tmp_path
 ):
-    DirTemplate(example1_dir).render(
+    example1_template.render(
         tmp_path,
         greetings=[
             {"recipient": "Graham", "sender": "Eric"},
             {"recipient": "Terry", "sender": "Michael"},
         ],
     )
-    comparison_result = dircmp(tmp_path, example1_expected_outputs_dir)
-    assert comparison_result.left_only == []
-    assert comparison_result.right_only == []
-    assert comparison_result.diff_files == []
-    assert comparison_result.funny_files == []
+    assert_tree_matches(tmp_path, example1_expected_outputs_manifest)
+
+
+def test_rendering_to_mapping(
+    example1_template, example1_expected_outputs_dir
+):
+    output = {}
+    example1_template.render(
+        output,
+        greetings=[
+            {"recipient": "Graham", "sender": "Eric"},
+            {"recipient": "Terry", "sender": "Michael"},
+        ],
+    )
+    assert output == {
+        p.name: p.read_text() for p in example1_expected_outputs_dir.iterdir()
+    }
 
 
-def test_overwrite_protection(example1_dir, tmp_path):
-    t = DirTemplate(example1_dir)
-    t.render(tmp_path, greetings=[{"sender": "John"}])
+def test_overwrite_protection_for_mapping(example1_template):
+    output = {}
+    example1_template.render(output, greetings=[{"sender": "John"}])
     with pytest.raises(TemplateOutputError) as exc_info:
-        t.render(tmp_path, greetings=[{"sender": "John"}])
+        example1_template.render(output, greetings=[{"sender": "John"}])
     assert isinstance(exc_info.value.__cause__, FileExistsError)
 
 
-# regression test for https://gitlab.com/smheidrich/mondir/-/issues/3
+def test_overwrite_protection(example1_template, tmp_path):
+    example1_template.render(tmp_path, greetings=[{"sender": "John"}])
+    with pytest.raises(TemplateOutputError) as exc_info:
+        example1_template.render(tmp_path, greetings=[{"sender": "John"}])
+    assert isinstance(exc_info.value.__cause__, FileExistsError)
 
 
-@pytest.fixture(scope="module")
-def example_nested_dir():
-    with resources.as_file(
-        resources.files("mondir_resources_anchor") / "examples/nested"
-    ) as p:
-        yield p
+def test_rendering_after_failed_rendering(
+    example1_template, example1_expected_outputs_manifest, tmp_path
+):
+    params = {
+        "greetings": [
+            {"recipient": "Graham", "sender": "Eric"},
+            {"recipient": "Terry", "sender": "Michael"},
+        ]
+    }
+    (tmp_path / "a").mkdir()
+    example1_template.render(tmp_path / "a", params)
+    with pytest.raises(TemplateOutputError):
+        example1_template.render(tmp_path / "a", params)
+    (tmp_path / "b").mkdir()
+    example1_template.render(tmp_path / "b", params)
+    assert_tree_matches(tmp_path / "b", example1_expected_outputs_manifest)
+
+
+# regression test for https://gitlab.com/smheidrich/mondir/-/issues/3
 
 
 @pytest.fixture(scope="module")
-def example_nested_expected_outputs_dir():
-    with resources.as_file(
-        resources.files() / "data/expected-outputs/nested"
-    ) as p:
-        yield p
+def example_nested_template(example_nested_dir):
+    return DirTemplate(example_nested_dir)
 
 
 def test_nested_template_happy_path(
-    example_nested_dir, example_nested_expected_outputs_dir, tmp_path
+    example_nested_template, example_nested_expected_outputs_manifest, tmp_path
 ):
-    DirTemplate(example_nested_dir).render(tmp_path)
-    comparison_result = dircmp(tmp_path, example_nested_expected_outputs_dir)
-    assert comparison_result.left_only == []
-    assert comparison_result.right_only == []
-    assert comparison_result.diff_files == []
-    assert comparison_result.funny_files == []
+    example_nested_template.render(tmp_path)
+    assert_tree_matches(tmp_path, example_nested_expected_outputs_manifest)
+
+
+def test_nested_template_to_mapping(example_nested_template):
+    output = {}
+    example_nested_template.render(output)
+    assert output == {"deeply/nested/template/dir/file.txt": ""}
 
 
 def test_nested_template_overwrite_happy_path(
-    example_nested_dir, example_nested_expected_outputs_dir, tmp_path
+    example_nested_dir,
+    example_nested_template,
+    example_nested_expected_outputs_manifest,
+    tmp_path,
 ):
-    DirTemplate(example_nested_dir).render(tmp_path)
+    example_nested_template.render(tmp_path)
     DirTemplate(example_nested_dir, overwrite=True).render(tmp_path)
-    comparison_result = dircmp(tmp_path, example_nested_expected_outputs_dir)
-    assert comparison_result.left_only == []
-    assert comparison_result.right_only == []
-    assert comparison_result.diff_files == []
-    assert comparison_result.funny_files == []
+    assert_tree_matches(tmp_path, example_nested_expected_outputs_manifest)
 
 
 def test_nested_template_overwrite_fails_if_not_set(
-    example_nested_dir, example_nested_expected_outputs_dir, tmp_path
+    example_nested_template, tmp_path
 ):
-    DirTemplate(example_nested_dir).render(tmp_path)
+    example_nested_template.render(tmp_path)
     with pytest.raises(TemplateOutputError) as exc_info:
-        DirTemplate(example_nested_dir).render(tmp_path)
+        example_nested_template.render(tmp_path)
     assert isinstance(exc_info.value.__cause__, FileExistsError)
 
 
 def test_nested_template_target_dir_does_not_exist(
-    example_nested_dir, example_nested_expected_outputs_dir, tmp_path
+    example_nested_template, example_nested_expected_outputs_dir, tmp_path
 ):
-    t = DirTemplate(example_nested_dir)
     with pytest.raises(TemplateOutputError) as exc_info:
-        t.render(tmp_path / "target")
+        example_nested_template.render(tmp_path / "target")
     assert isinstance(exc_info.value.__cause__, FileNotFoundError)
@@ -1,7 +0,0 @@
-from parametrization import Parametrization  # type: ignore
-
-autodetect_parameters = Parametrization.autodetect_parameters
-case = Parametrization.case
-default_parameters = Parametrization.default_parameters
-name_factory = Parametrization.name_factory
-parameters = Parametrization.parameters
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import file_digest
+from pathlib import Path
+
+Manifest = dict[str, tuple[int, bytes]]
+"Mapping of relative file paths to file sizes and content hashes."
+
+
+def hash_file(path: str | Path) -> bytes:
+    # unbuffered, so file_digest reads straight into its own buffer
+    with open(path, "rb", buffering=0) as f:
+        return file_digest(f, "blake2b").digest()
+
+
+def hash_files(root: Path, relpaths: list[str]) -> list[bytes]:
+    # hashlib releases the GIL while hashing, so threads overlap both the
+    # reads and the hashing itself
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(hash_file, [root / p for p in relpaths]))
+
+
+def file_sizes(root: Path) -> dict[str, int]:
+    """
+    Map the path (relative to `root`) of each file below `root` to its size.
+    """
+    sizes: dict[str, int] = {}
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+                else:
+                    relpath = os.path.relpath(entry.path, root)
+                    sizes[relpath] = entry.stat(follow_symlinks=False).st_size
+    return sizes
+
+
+def tree_manifest(root: Path) -> Manifest:
+    """
+    Compute the manifest of all files below `root`.
+    """
+    sizes = file_sizes(root)
+    digests = hash_files(root, list(sizes))
+    return dict(zip(sizes, zip(sizes.values(), digests)))
+
+
+def assert_tree_matches(root: Path, manifest: Manifest) -> None:
+    """
+    Assert that a directory tree contains exactly the files in `manifest`.
+
+    Contents are only read (and hashed) once names and sizes are known to
+    match, so most mismatches are reported without any file I/O.
+    """
+    sizes = file_sizes(root)
+    assert sizes == {relpath: size for relpath, (size, _) in manifest.items()}
+    relpaths = list(sizes)
+    for relpath, digest in zip(relpaths, hash_files(root, relpaths)):
+        assert digest == manifest[relpath][1], f"contents differ: {relpath}"